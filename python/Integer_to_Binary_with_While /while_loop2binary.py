@@ -8,19 +8,10 @@ def conv2binary():
         print("Please enter a non-negative integer.")
         return
 
-    binary = ""
-    if n == 0:
-        binary = "0"
-    else:
-        while n > 0:
-            remainder = n % 2
-            binary = str(remainder) + binary
-            n = n // 2
-            print(type(binary))
-            print(binary)
-            
+    # bin() does the divide-by-2 loop in C; "0b" prefix stripped
+    binary = bin(n)[2:]
 
     print("Binary representation:", binary)
 
 
-conv2binary()
\ No newline at end of file
+conv2binary()
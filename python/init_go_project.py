@@ -12,71 +12,29 @@ Examples:
 from __future__ import annotations
 
 import argparse
+import os
+import shlex
 import shutil
 import subprocess
+import sys
+import time
+import zipfile
 from pathlib import Path
+from string import Template
 
+_MKDIR_CACHE: set[Path] = set()
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
 
-def sh(cmd: list[str], cwd: Path | None = None) -> None:
-    subprocess.run(cmd, cwd=str(cwd) if cwd else None, check=True)
-
-
-def w(p: Path, s: str) -> None:
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(s, encoding="utf-8")
-
-
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Go project scaffold")
-    ap.add_argument("-n", "--name", required=True, help="Project dir name")
-    ap.add_argument("-m", "--module", default="", help="Go module path (default: github.com/yourname/<name>)")
-    ap.add_argument("-o", "--out", default=".", help="Parent output dir")
-    ap.add_argument("-b", "--bin", default="", help="Binary name (default: name)")
-    ap.add_argument("-f", "--force", action="store_true", help="Overwrite existing dir")
-    ap.add_argument("--features", default="", help="comma list: makefile,docker,compose,pgx,repo,git,all")
-    a = ap.parse_args()
-
-    name = a.name.strip()
-    bin_name = a.bin.strip() or name
-    module = a.module.strip() or f"github.com/yourname/{name}"
-
-    feats = {x.strip().lower() for x in a.features.split(",") if x.strip()}
-    all_on = "all" in feats
-    def on(k: str) -> bool: return all_on or (k in feats)
-
-    add_make = on("makefile")
-    add_docker = on("docker") or on("compose")
-    add_compose = on("compose") or on("repo")
-    add_pgx = on("pgx") or on("repo")
-    add_repo = on("repo")
-    add_git = on("git")
-
-    target = (Path(a.out).expanduser().resolve() / name)
-    if target.exists():
-        if a.force:
-            shutil.rmtree(target)
-        else:
-            raise SystemExit(f"ERROR: target exists: {target} (use -f/--force)")
-
-    (target / f"cmd/{bin_name}").mkdir(parents=True, exist_ok=True)
-    (target / "internal").mkdir(parents=True, exist_ok=True)
-    (target / "pkg").mkdir(parents=True, exist_ok=True)
-
-    sh(["go", "mod", "init", module], cwd=target)
-
-    w(target / f"cmd/{bin_name}/main.go", f'''package main
+_MAIN_GO_TMPL = Template('''package main
 
 import "log"
 
-func main() {{
-    log.Println("✅ {name} is alive")
-}}
+func main() {
+    log.Println("✅ $name is alive")
+}
 ''')
 
-    if add_pgx:
-        (target / "pkg/database").mkdir(parents=True, exist_ok=True)
-        sh(["go", "get", "github.com/jackc/pgx/v5/pgxpool"], cwd=target)
-        w(target / "pkg/database/postgres.go", '''package database
+_POSTGRES_GO = '''package database
 
 import (
     "context"
@@ -107,38 +65,33 @@ func NewPostgresPool(ctx context.Context) (*pgxpool.Pool, error) {
     }
     return pool, nil
 }
-''')
+'''
 
-        w(target / f"cmd/{bin_name}/main.go", f'''package main
+_MAIN_PGX_GO_TMPL = Template('''package main
 
 import (
     "context"
     "log"
     "time"
 
-    "{module}/pkg/database"
+    "$module/pkg/database"
 )
 
-func main() {{
+func main() {
     ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
     defer cancel()
 
     pool, err := database.NewPostgresPool(ctx)
-    if err != nil {{
+    if err != nil {
         log.Fatalf("DB connection failed: %v", err)
-    }}
+    }
     defer pool.Close()
 
     log.Println("✅ connected to Postgres via pgxpool")
-}}
+}
 ''')
 
-    if add_repo:
-        (target / "internal/model").mkdir(parents=True, exist_ok=True)
-        (target / "internal/repository").mkdir(parents=True, exist_ok=True)
-        (target / "init-db").mkdir(parents=True, exist_ok=True)
-
-        w(target / "internal/model/user.go", '''package model
+_USER_GO = '''package model
 
 import "time"
 
@@ -147,57 +100,55 @@ type User struct {
     Email     string
     CreatedAt time.Time
 }
-''')
+'''
 
-        w(target / "internal/repository/user_repository.go", f'''package repository
+_USER_REPO_GO_TMPL = Template('''package repository
 
 import (
     "context"
 
-    "{module}/internal/model"
+    "$module/internal/model"
     "github.com/jackc/pgx/v5/pgxpool"
 )
 
-type UserRepository struct {{ db *pgxpool.Pool }}
+type UserRepository struct { db *pgxpool.Pool }
 
-func NewUserRepository(db *pgxpool.Pool) *UserRepository {{ return &UserRepository{{db: db}} }}
+func NewUserRepository(db *pgxpool.Pool) *UserRepository { return &UserRepository{db: db} }
 
-func (r *UserRepository) Create(ctx context.Context, email string) (*model.User, error) {{
-    const q = "INSERT INTO users (email) VALUES ($1) RETURNING id, email, created_at"
-    u := &model.User{{}}
+func (r *UserRepository) Create(ctx context.Context, email string) (*model.User, error) {
+    const q = "INSERT INTO users (email) VALUES ($$1) RETURNING id, email, created_at"
+    u := &model.User{}
     err := r.db.QueryRow(ctx, q, email).Scan(&u.ID, &u.Email, &u.CreatedAt)
-    if err != nil {{ return nil, err }}
+    if err != nil { return nil, err }
     return u, nil
-}}
+}
 ''')
 
-        w(target / "init-db/01_init.sql", '''CREATE TABLE IF NOT EXISTS users (
+_INIT_SQL = '''CREATE TABLE IF NOT EXISTS users (
   id SERIAL PRIMARY KEY,
   email TEXT UNIQUE NOT NULL,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
-''')
+'''
 
-    if add_docker:
-        w(target / "Dockerfile", f'''FROM golang:1.24-alpine AS builder
+_DOCKERFILE_TMPL = Template('''FROM golang:1.24-alpine AS builder
 WORKDIR /app
 COPY go.mod go.sum ./
 RUN go mod download
 COPY . .
-RUN CGO_ENABLED=0 GOOS=linux go build -o /app/bin/{bin_name} ./cmd/{bin_name}
+RUN CGO_ENABLED=0 GOOS=linux go build -o /app/bin/$bin ./cmd/$bin
 
 FROM alpine:3.20
 WORKDIR /app
-COPY --from=builder /app/bin/{bin_name} .
-CMD ["./{bin_name}"]
+COPY --from=builder /app/bin/$bin .
+CMD ["./$bin"]
 ''')
 
-    if add_compose:
-        compose = f'''services:
+_COMPOSE_TMPL = Template('''services:
   app:
     build: .
     environment:
-      - DATABASE_URL=postgres://user:pass@db:5432/{name}?sslmode=disable
+      - DATABASE_URL=postgres://user:pass@db:5432/$name?sslmode=disable
     depends_on:
       db:
         condition: service_healthy
@@ -207,28 +158,26 @@ CMD ["./{bin_name}"]
     environment:
       - POSTGRES_USER=user
       - POSTGRES_PASSWORD=pass
-      - POSTGRES_DB={name}
+      - POSTGRES_DB=$name
     ports:
       - "5432:5432"
     healthcheck:
-      test: ["CMD-SHELL", "pg_isready -U user -d {name}"]
+      test: ["CMD-SHELL", "pg_isready -U user -d $name"]
       interval: 5s
       timeout: 5s
       retries: 10
-'''
-        if add_repo:
-            compose += "    volumes:\n      - ./init-db:/docker-entrypoint-initdb.d\n"
-        w(target / "docker-compose.yaml", compose)
+''')
 
-    if add_make:
-        w(target / "Makefile", f'''BINARY={bin_name}
+_COMPOSE_INITDB = "    volumes:\n      - ./init-db:/docker-entrypoint-initdb.d\n"
+
+_MAKEFILE_TMPL = Template('''BINARY=$bin
 
 .PHONY: build run test clean docker-build up down
 build:
-	go build -o bin/$(BINARY) ./cmd/$(BINARY)
+	go build -o bin/$$(BINARY) ./cmd/$$(BINARY)
 
 run:
-	go run ./cmd/$(BINARY)/main.go
+	go run ./cmd/$$(BINARY)/main.go
 
 test:
 	go test ./...
@@ -237,7 +186,7 @@ clean:
 	rm -rf bin/
 
 docker-build:
-	docker build -t $(BINARY):latest .
+	docker build -t $$(BINARY):latest .
 
 up:
 	docker compose up --build
@@ -246,24 +195,258 @@ down:
 	docker compose down
 ''')
 
-    w(target / "README.md", f'''# {name}
+_README_TMPL = Template('''# $name
 
 Generated with init_go_project.py
 
 ## Run
 ```bash
-go run ./cmd/{bin_name}
+go run ./cmd/$bin
 ```
 ''')
 
-    if add_git:
-        sh(["git", "init"], cwd=target)
 
-    sh(["go", "mod", "tidy"], cwd=target)
+def spawn(cmd: list[str], cwd: Path | None = None, quiet: bool = True) -> subprocess.Popen:
+    # quiet drops stdout and holds stderr back, so `go: downloading ...` progress
+    # never hits the terminal/CI log; wait() replays stderr only if the command fails
+    return subprocess.Popen(
+        cmd,
+        cwd=str(cwd) if cwd else None,
+        stdout=subprocess.DEVNULL if quiet else None,
+        stderr=subprocess.PIPE if quiet else None,
+    )
+
+
+def wait(proc: subprocess.Popen) -> int:
+    _, err = proc.communicate()
+    if proc.returncode and err:
+        sys.stderr.buffer.write(err)
+    return proc.returncode
+
+
+def w(p: Path, data: bytes) -> None:
+    # leave identical files (and their mtimes) alone on --update re-runs
+    try:
+        st = os.stat(p)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_size == len(data) and p.read_bytes() == data:
+        return
+    # os.write() straight from the bytes payload; the io stack adds nothing here.
+    # Written beside the target and renamed over it, so an interrupted run never
+    # leaves a truncated file behind. The temp name is random and opened O_EXCL, so
+    # it can never reuse (and clobber) a file of the user's.
+    tmp = p.with_name(f".{p.name}.{os.urandom(4).hex()}.tmp")
+    fd = os.open(tmp, _WRITE_FLAGS, 0o666)
+    try:
+        try:
+            if st is not None and hasattr(os, "fchmod"):
+                # the rename swaps in a new inode; carry the old file's permission bits over
+                os.fchmod(fd, st.st_mode & 0o7777)
+            # write() may return short (signal, nearly full disk); finish or raise
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp, p)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _go_mod_module(p: Path) -> str | None:
+    try:
+        text = p.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] == "module":
+            return parts[1].strip('"')
+    return None
+
+
+def _fast_rmtree(p: Path) -> None:
+    # rm -rf unlinks with unlinkat() in C instead of one Python call per entry
+    if os.name == "posix":
+        subprocess.run(["rm", "-rf", "--", str(p)], check=True)
+    else:
+        shutil.rmtree(p)
+
+
+def _mkdir(d: Path, parents: bool = True) -> None:
+    # d and all its ancestors exist once this returns; later siblings skip the stat walk.
+    # parents=False is a single mkdir() for callers that made the parent already.
+    if d in _MKDIR_CACHE:
+        return
+    if parents:
+        os.makedirs(d, exist_ok=True)
+    else:
+        d.mkdir(exist_ok=True)
+    _MKDIR_CACHE.add(d)
+    _MKDIR_CACHE.update(d.parents)
+
+
+class Scaffold:
+    """In-memory project tree; flush() writes it out in one ordered pass."""
+
+    def __init__(self) -> None:
+        self.files: dict[Path, bytes] = {}
+        self.dirs: set[Path] = set()
+
+    def mkdir(self, rel: str) -> None:
+        self.dirs.add(Path(rel))
+
+    def add(self, rel: str, s: str) -> None:
+        self.files[Path(rel)] = s.encode("utf-8")
+
+    def flush(self, target: Path) -> None:
+        _mkdir(target)
+        leaves = self.dirs | {p.parent for p in self.files}
+        rel_dirs = {a for d in leaves for a in (d, *d.parents) if a.parts}
+        # shallowest first, so each directory's parent already exists
+        for d in sorted(rel_dirs, key=lambda d: len(d.parts)):
+            _mkdir(target / d, parents=False)
+        # one directory at a time, in a stable order
+        for p in sorted(self.files, key=lambda p: (p.parent, p.name)):
+            w(target / p, self.files[p])
+        self.files.clear()
+        self.dirs.clear()
+
+    def archive(self, path: Path, root: str) -> None:
+        # Same tree as flush(), but under root/ inside a zip; nothing is written beside it.
+        _mkdir(path.parent)
+        now = time.localtime()[:6]
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for d in sorted(self.dirs):
+                zf.writestr(f"{root}/{d.as_posix()}/", "")
+            for p in sorted(self.files, key=lambda p: (p.parent, p.name)):
+                zi = zipfile.ZipInfo(f"{root}/{p.as_posix()}", now)
+                zi.external_attr = 0o644 << 16
+                zf.writestr(zi, self.files[p], zipfile.ZIP_DEFLATED, 1)
+        self.files.clear()
+        self.dirs.clear()
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Go project scaffold")
+    ap.add_argument("-n", "--name", required=True, help="Project dir name")
+    ap.add_argument("-m", "--module", default="", help="Go module path (default: go.mod module with -u, else github.com/yourname/<name>)")
+    ap.add_argument("-o", "--out", default=".", help="Parent output dir")
+    ap.add_argument("-b", "--bin", default="", help="Binary name (default: name)")
+    ap.add_argument("-f", "--force", action="store_true", help="Overwrite existing dir")
+    ap.add_argument("-u", "--update", action="store_true", help="Regenerate into existing dir, skipping unchanged files")
+    ap.add_argument("--archive", default="", help="Write the project into this .zip instead of --out (skips go/git commands)")
+    ap.add_argument("--features", default="", help="comma list: makefile,docker,compose,pgx,repo,git,all")
+    return ap
+
+
+_PARSER = _build_parser()
+
+
+def main(argv: list[str] | None = None) -> int:
+    a = _PARSER.parse_args(argv)
+    # the cache only holds for one run: anything may have been removed since the last
+    _MKDIR_CACHE.clear()
+
+    name = a.name.strip()
+    bin_name = a.bin.strip() or name
+    module = a.module.strip() or f"github.com/yourname/{name}"
 
-    print(f"✅ Created: {target}")
+    feats = {x.strip().lower() for x in a.features.split(",") if x.strip()}
+    all_on = "all" in feats
+    def on(k: str) -> bool: return all_on or (k in feats)
+
+    add_make = on("makefile")
+    add_docker = on("docker") or on("compose")
+    add_compose = on("compose") or on("repo")
+    add_pgx = on("pgx") or on("repo")
+    add_repo = on("repo")
+    add_git = on("git")
+
+    target = Path(os.path.abspath(os.path.expanduser(a.out))) / name
+    archive = Path(os.path.abspath(os.path.expanduser(a.archive))) if a.archive else None
+    if archive:
+        if archive.exists() and not a.force:
+            raise SystemExit(f"ERROR: archive exists: {archive} (use -f/--force)")
+    elif target.exists():
+        if a.force:
+            _fast_rmtree(target)
+        elif not a.update:
+            raise SystemExit(f"ERROR: target exists: {target} (use -f/--force or -u/--update)")
+        else:
+            # --update keeps go.mod, so the regenerated imports must use the module it declares
+            current = _go_mod_module(target / "go.mod")
+            if current and a.module.strip() and a.module.strip() != current:
+                raise SystemExit(f"ERROR: {target}/go.mod declares module {current}, not {a.module.strip()} "
+                                 "(use -f/--force to regenerate under a new module)")
+            module = a.module.strip() or current or module
+
+    subs = {"name": name, "bin": bin_name, "module": module}
+    scaf = Scaffold()
+    scaf.mkdir("internal")
+    scaf.mkdir("pkg")
+
+    scaf.add(f"cmd/{bin_name}/main.go", _MAIN_GO_TMPL.substitute(subs))
+
+    if add_pgx:
+        scaf.add("pkg/database/postgres.go", _POSTGRES_GO)
+        scaf.add(f"cmd/{bin_name}/main.go", _MAIN_PGX_GO_TMPL.substitute(subs))
+
+    if add_repo:
+        scaf.add("internal/model/user.go", _USER_GO)
+        scaf.add("internal/repository/user_repository.go", _USER_REPO_GO_TMPL.substitute(subs))
+        scaf.add("init-db/01_init.sql", _INIT_SQL)
+
+    # Go sources are complete: start the module chain (and git init) and
+    # emit the remaining files while they run.
+    procs: list[subprocess.Popen] = []
+    try:
+        if not archive:
+            scaf.flush(target)
+            # tidy resolves pgx from the imports, so no separate `go get` is needed
+            cmds = ["go mod tidy"]
+            if not (target / "go.mod").exists():
+                cmds.insert(0, f"go mod init {shlex.quote(module)}")
+            procs.append(spawn(["sh", "-c", " && ".join(cmds)], cwd=target))
+            if add_git:
+                procs.append(spawn(["git", "init"], cwd=target))
+
+        if add_docker:
+            scaf.add("Dockerfile", _DOCKERFILE_TMPL.substitute(subs))
+
+        if add_compose:
+            compose_parts = [_COMPOSE_TMPL.substitute(subs)]
+            if add_repo:
+                compose_parts.append(_COMPOSE_INITDB)
+            scaf.add("docker-compose.yaml", "".join(compose_parts))
+
+        if add_make:
+            scaf.add("Makefile", _MAKEFILE_TMPL.substitute(subs))
+
+        scaf.add("README.md", _README_TMPL.substitute(subs))
+        if archive:
+            scaf.archive(archive, name)
+        else:
+            scaf.flush(target)
+    finally:
+        # reap every child, even if a spawn or the flush above raised
+        rcs = [wait(proc) for proc in procs]
+    rc = next((rc for rc in rcs if rc), 0)
+    if rc:
+        raise SystemExit(rc)
+
+    print(f"✅ Created: {archive or target}")
     print(f"   Module:  {module}")
     print(f"   Binary:  {bin_name}")
+    if archive:
+        print(f"   Next:    go mod init {module} && go mod tidy  (after extracting)")
+        if add_git:
+            print("   (git init skipped in --archive mode)")
     return 0
 
 
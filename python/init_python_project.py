@@ -6,23 +6,127 @@
 from __future__ import annotations
 
 import argparse
-import re
-import shutil
-import subprocess
+import os
 from pathlib import Path
 
+# shutil, subprocess, time and zipfile are imported where used: the
+# default invocation (no --force/--git/--archive) never needs them.
+
+_MKDIR_CACHE: set[Path] = set()
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+_SLUG_TABLE = str.maketrans({c: '_' for c in map(chr, range(128)) if not c.isalnum()})
+
 
 def sh(cmd: list[str], cwd: Path | None = None) -> None:
+    import subprocess
     subprocess.run(cmd, cwd=str(cwd) if cwd else None, check=True)
 
 
-def w(path: Path, text: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding='utf-8')
+def w(path: Path, data: bytes) -> None:
+    # leave identical files (and their mtimes) alone on --update re-runs
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_size == len(data) and path.read_bytes() == data:
+        return
+    # os.write() straight from the bytes payload; the io stack adds nothing here.
+    # Written beside the target and renamed over it, so an interrupted run never
+    # leaves a truncated file behind. The temp name is random and opened O_EXCL, so
+    # it can never reuse (and clobber) a file of the user's.
+    tmp = path.with_name(f'.{path.name}.{os.urandom(4).hex()}.tmp')
+    fd = os.open(tmp, _WRITE_FLAGS, 0o666)
+    try:
+        try:
+            if st is not None and hasattr(os, 'fchmod'):
+                # the rename swaps in a new inode; carry the old file's permission bits over
+                os.fchmod(fd, st.st_mode & 0o7777)
+            # write() may return short (signal, nearly full disk); finish or raise
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _fast_rmtree(p: Path) -> None:
+    # rm -rf unlinks with unlinkat() in C instead of one Python call per entry
+    if os.name == 'posix':
+        sh(['rm', '-rf', '--', str(p)])
+    else:
+        import shutil
+        shutil.rmtree(p)
+
+
+def _mkdir(d: Path, parents: bool = True) -> None:
+    # d and all its ancestors exist once this returns; later siblings skip the stat walk.
+    # parents=False is a single mkdir() for callers that made the parent already.
+    if d in _MKDIR_CACHE:
+        return
+    if parents:
+        os.makedirs(d, exist_ok=True)
+    else:
+        d.mkdir(exist_ok=True)
+    _MKDIR_CACHE.add(d)
+    _MKDIR_CACHE.update(d.parents)
+
+
+class Scaffold:
+    """In-memory project tree; flush() writes it out in one ordered pass."""
+
+    def __init__(self) -> None:
+        self.files: dict[Path, bytes] = {}
+        self.dirs: set[Path] = set()
+
+    def mkdir(self, rel: str) -> None:
+        self.dirs.add(Path(rel))
+
+    def add(self, rel: str, text: str) -> None:
+        self.files[Path(rel)] = text.encode('utf-8')
+
+    def flush(self, target: Path) -> None:
+        _mkdir(target)
+        leaves = self.dirs | {p.parent for p in self.files}
+        rel_dirs = {a for d in leaves for a in (d, *d.parents) if a.parts}
+        # shallowest first, so each directory's parent already exists
+        for d in sorted(rel_dirs, key=lambda d: len(d.parts)):
+            _mkdir(target / d, parents=False)
+        # one directory at a time, in a stable order
+        for p in sorted(self.files, key=lambda p: (p.parent, p.name)):
+            w(target / p, self.files[p])
+        self.files.clear()
+        self.dirs.clear()
+
+    def archive(self, path: Path, root: str) -> None:
+        # Same tree as flush(), but under root/ inside a zip; nothing is written beside it.
+        import time
+        import zipfile
+        _mkdir(path.parent)
+        now = time.localtime()[:6]
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for d in sorted(self.dirs):
+                zf.writestr(f'{root}/{d.as_posix()}/', '')
+            for p in sorted(self.files, key=lambda p: (p.parent, p.name)):
+                zi = zipfile.ZipInfo(f'{root}/{p.as_posix()}', now)
+                zi.external_attr = 0o644 << 16
+                zf.writestr(zi, self.files[p], zipfile.ZIP_DEFLATED, 1)
+        self.files.clear()
+        self.dirs.clear()
 
 
 def slug_to_pkg(name: str) -> str:
-    s = re.sub(r'[^a-zA-Z0-9]+', '_', name.strip()).strip('_').lower()
+    # non-ASCII becomes '?' first so the table covers every character
+    s = name.strip().encode('ascii', 'replace').decode('ascii').translate(_SLUG_TABLE)
+    while '__' in s:
+        s = s.replace('__', '_')
+    s = s.strip('_').lower()
     if not s:
         return 'app'
     if s[0].isdigit():
@@ -30,15 +134,26 @@ def slug_to_pkg(name: str) -> str:
     return s
 
 
-def main() -> int:
+def _build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser(description='Modern Python project scaffold (src/ layout + pyproject.toml).')
     ap.add_argument('-n', '--name', required=True, help='Project dir name (hyphens ok)')
     ap.add_argument('-p', '--package', default='', help='Import package name (default derived)')
     ap.add_argument('-o', '--out', default='.', help='Parent output dir')
     ap.add_argument('-g', '--git', action='store_true', help='git init')
     ap.add_argument('-f', '--force', action='store_true', help='overwrite existing dir')
+    ap.add_argument('-u', '--update', action='store_true', help='regenerate into existing dir, skipping unchanged files')
+    ap.add_argument('--archive', default='', help='write the project into this .zip instead of --out (skips git init)')
     ap.add_argument('--features', default='', help='comma list: ruff,pytest,mypy,precommit,github,docker,compose,mkdocs,makefile,all')
-    a = ap.parse_args()
+    return ap
+
+
+_PARSER = _build_parser()
+
+
+def main(argv: list[str] | None = None) -> int:
+    a = _PARSER.parse_args(argv)
+    # the cache only holds for one run: anything may have been removed since the last
+    _MKDIR_CACHE.clear()
 
     name = a.name.strip()
     pkg = a.package.strip() or slug_to_pkg(name)
@@ -58,41 +173,41 @@ def main() -> int:
     use_mkdocs = on('mkdocs')
     use_makefile = on('makefile')
 
-    target = (Path(a.out).expanduser().resolve() / name)
-    if target.exists():
+    target = Path(os.path.abspath(os.path.expanduser(a.out))) / name
+    archive = Path(os.path.abspath(os.path.expanduser(a.archive))) if a.archive else None
+    if archive:
+        if archive.exists() and not a.force:
+            raise SystemExit(f'ERROR: archive exists: {archive} (use -f/--force)')
+    elif target.exists():
         if a.force:
-            shutil.rmtree(target)
-        else:
-            raise SystemExit(f'ERROR: target exists: {target} (use -f/--force)')
+            _fast_rmtree(target)
+        elif not a.update:
+            raise SystemExit(f'ERROR: target exists: {target} (use -f/--force or -u/--update)')
 
-    (target / 'src' / pkg).mkdir(parents=True, exist_ok=True)
-    (target / 'scripts').mkdir(parents=True, exist_ok=True)
-    if use_pytest:
-        (target / 'tests').mkdir(parents=True, exist_ok=True)
-    if use_mkdocs:
-        (target / 'docs').mkdir(parents=True, exist_ok=True)
-    if use_github:
-        (target / '.github' / 'workflows').mkdir(parents=True, exist_ok=True)
-
-    w(target / 'src' / pkg / '__init__.py', "__all__ = []\n__version__ = '0.1.0'\n")
-
-    cli = (
-        'from __future__ import annotations\n\n'
-        'import argparse\n\n'
-        f"def main(argv: list[str] | None = None) -> int:\n"
-        f"    p = argparse.ArgumentParser(prog='{name}', description='{name} CLI')\n"
-        "    p.add_argument('--version', action='store_true')\n"
-        "    ns = p.parse_args(argv)\n"
-        "    if ns.version:\n"
-        f"        from {pkg} import __version__\n"
-        "        print(__version__)\n"
-        "        return 0\n"
-        f"    print('✅ {name} is alive')\n"
-        "    return 0\n\n"
-        "if __name__ == '__main__':\n"
-        "    raise SystemExit(main())\n"
-    )
-    w(target / 'src' / pkg / 'cli.py', ''.join(cli))
+    scaf = Scaffold()
+    scaf.mkdir('scripts')
+
+    scaf.add(f'src/{pkg}/__init__.py', "__all__ = []\n__version__ = '0.1.0'\n")
+
+    cli = f"""from __future__ import annotations
+
+import argparse
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog='{name}', description='{name} CLI')
+    p.add_argument('--version', action='store_true')
+    ns = p.parse_args(argv)
+    if ns.version:
+        from {pkg} import __version__
+        print(__version__)
+        return 0
+    print('✅ {name} is alive')
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
+"""
+    scaf.add(f'src/{pkg}/cli.py', cli)
 
     readme = f"""# {name}
 
@@ -108,81 +223,91 @@ pip install -e \".[dev]\"
 - package: `{pkg}`
 - entrypoint: `{name}` -> `{pkg}.cli:main`
 """
-    w(target / 'README.md', readme + '\n')
+    scaf.add('README.md', readme + '\n')
 
-    w(target / '.gitignore', '.venv/\n__pycache__/\n*.pyc\n.pytest_cache/\n.mypy_cache/\n.ruff_cache/\n'                            'dist/\nbuild/\n*.egg-info/\n.coverage\nhtmlcov/\n.DS_Store\n.env\n')
+    scaf.add('.gitignore', '.venv/\n__pycache__/\n*.pyc\n.pytest_cache/\n.mypy_cache/\n.ruff_cache/\n'                            'dist/\nbuild/\n*.egg-info/\n.coverage\nhtmlcov/\n.DS_Store\n.env\n')
 
     if use_pytest:
-        w(target / 'tests' / 'test_smoke.py', 'def test_smoke():\n    assert True\n')
+        scaf.add('tests/test_smoke.py', 'def test_smoke():\n    assert True\n')
 
     if use_mkdocs:
-        w(target / 'mkdocs.yml', f'site_name: {name}\nnav:\n  - Home: index.md\n')
-        w(target / 'docs' / 'index.md', f'# {name}\n')
+        scaf.add('mkdocs.yml', f'site_name: {name}\nnav:\n  - Home: index.md\n')
+        scaf.add('docs/index.md', f'# {name}\n')
 
     dev_deps: list[str] = []
-    tool = ''
+    tool_parts: list[str] = []
     if use_ruff:
         dev_deps.append('ruff>=0.6.0')
-        tool += '[tool.ruff]\nline-length = 100\ntarget-version = "py311"\nfix = true\n\n'                '[tool.ruff.lint]\nselect = ["E","F","I","B","UP","SIM"]\n'
+        tool_parts.append('[tool.ruff]\nline-length = 100\ntarget-version = "py311"\nfix = true\n\n'
+                          '[tool.ruff.lint]\nselect = ["E","F","I","B","UP","SIM"]\n')
     if use_pytest:
         dev_deps += ['pytest>=8.0.0', 'pytest-cov>=5.0.0']
-        tool += '[tool.pytest.ini_options]\ntestpaths = ["tests"]\naddopts = "-q"\n'
+        tool_parts.append('[tool.pytest.ini_options]\ntestpaths = ["tests"]\naddopts = "-q"\n')
     if use_mypy:
         dev_deps += ['mypy>=1.10.0', 'types-setuptools']
-        tool += '[tool.mypy]\npython_version = "3.11"\ndisallow_untyped_defs = true\n'
+        tool_parts.append('[tool.mypy]\npython_version = "3.11"\ndisallow_untyped_defs = true\n')
     dev_deps = list(dict.fromkeys(dev_deps))
 
-    pyproject = (
-        '[build-system]\nrequires = ["hatchling>=1.25.0"]\nbuild-backend = "hatchling.build"\n\n'
-        f'[project]\nname = "{name}"\nversion = "0.1.0"\nrequires-python = ">=3.11"\ndependencies = []\n\n'
-        f'[project.optional-dependencies]\ndev = {dev_deps if dev_deps else []}\n\n'
-        f'[project.scripts]\n{name} = "{pkg}.cli:main"\n\n'
-        f'[tool.hatch.build.targets.wheel]\npackages = ["src/{pkg}"]\n\n'
-        tool
-    )
-    w(target / 'pyproject.toml', ''.join(pyproject))
+    pyproject_parts = [
+        '[build-system]\nrequires = ["hatchling>=1.25.0"]\nbuild-backend = "hatchling.build"\n\n',
+        f'[project]\nname = "{name}"\nversion = "0.1.0"\nrequires-python = ">=3.11"\ndependencies = []\n\n',
+        f'[project.optional-dependencies]\ndev = {dev_deps if dev_deps else []}\n\n',
+        f'[project.scripts]\n{name} = "{pkg}.cli:main"\n\n',
+        f'[tool.hatch.build.targets.wheel]\npackages = ["src/{pkg}"]\n\n',
+        *tool_parts,
+    ]
+    scaf.add('pyproject.toml', ''.join(pyproject_parts))
 
     if use_precommit:
-        pc = 'repos:\n- repo: https://github.com/pre-commit/pre-commit-hooks\n  rev: v4.6.0\n  hooks:\n'
-        pc += '    - id: end-of-file-fixer\n    - id: trailing-whitespace\n    - id: check-yaml\n    - id: check-toml\n'
+        pc_parts = [
+            'repos:\n- repo: https://github.com/pre-commit/pre-commit-hooks\n  rev: v4.6.0\n  hooks:\n',
+            '    - id: end-of-file-fixer\n    - id: trailing-whitespace\n    - id: check-yaml\n    - id: check-toml\n',
+        ]
         if use_ruff:
-            pc += '- repo: https://github.com/astral-sh/ruff-pre-commit\n  rev: v0.6.9\n  hooks:\n'
-            pc += '    - id: ruff\n      args: ["--fix"]\n    - id: ruff-format\n'
-        w(target / '.pre-commit-config.yaml', pc)
+            pc_parts.append('- repo: https://github.com/astral-sh/ruff-pre-commit\n  rev: v0.6.9\n  hooks:\n')
+            pc_parts.append('    - id: ruff\n      args: ["--fix"]\n    - id: ruff-format\n')
+        scaf.add('.pre-commit-config.yaml', ''.join(pc_parts))
 
     if use_github:
-        steps = []
+        steps: list[str] = []
         if use_ruff:
             steps += ['      - run: python -m pip install -U pip ruff', '      - run: ruff check .', '      - run: ruff format --check .']
         if use_pytest:
             steps += ['      - run: python -m pip install -U pip ".[dev]"', '      - run: pytest']
         if not steps:
             steps = ['      - run: python -c "print(\'CI ok\')"']
-        ci = (
+        ci_parts = [
             'name: ci\non: [push, pull_request]\njobs:\n  test:\n    runs-on: ubuntu-latest\n    steps:\n'
             '      - uses: actions/checkout@v4\n'
-            '      - uses: actions/setup-python@v5\n        with:\n          python-version: "3.11"\n'
-            '\n'.join(steps) + '\n'
-        )
-        w(target / '.github' / 'workflows' / 'ci.yml', ''.join(ci))
+            '      - uses: actions/setup-python@v5\n        with:\n          python-version: "3.11"\n',
+            *(f'{step}\n' for step in steps),
+        ]
+        scaf.add('.github/workflows/ci.yml', ''.join(ci_parts))
 
     if use_docker:
-        w(target / 'Dockerfile', f'FROM python:3.12-slim\nWORKDIR /app\nCOPY pyproject.toml README.md /app/\nCOPY src /app/src\n'                               f'RUN python -m pip install -U pip && pip install .\nCMD ["{name}", "--help"]\n')
+        scaf.add('Dockerfile', f'FROM python:3.12-slim\nWORKDIR /app\nCOPY pyproject.toml README.md /app/\nCOPY src /app/src\n'                               f'RUN python -m pip install -U pip && pip install .\nCMD ["{name}", "--help"]\n')
         if use_compose:
-            w(target / 'docker-compose.yaml', 'services:\n  app:\n    build: .\n')
+            scaf.add('docker-compose.yaml', 'services:\n  app:\n    build: .\n')
 
     if use_makefile:
-        mk = f'run:\n\tpython -m {pkg}.cli\n'
+        mk_parts = [f'run:\n\tpython -m {pkg}.cli\n']
         if use_ruff:
-            mk += 'lint:\n\truff check .\nfmt:\n\truff format .\n'
+            mk_parts.append('lint:\n\truff check .\nfmt:\n\truff format .\n')
         if use_pytest:
-            mk += 'test:\n\tpytest\n'
-        w(target / 'Makefile', mk)
+            mk_parts.append('test:\n\tpytest\n')
+        scaf.add('Makefile', ''.join(mk_parts))
+
+    if archive:
+        scaf.archive(archive, name)
+    else:
+        scaf.flush(target)
 
-    if a.git:
+    if a.git and not archive:
         sh(['git', 'init'], cwd=target)
 
-    print(f'✅ Created: {target}')
+    print(f'✅ Created: {archive or target}')
+    if a.git and archive:
+        print('   (git init skipped in --archive mode)')
     return 0
 
 